@@ -2,13 +2,21 @@
 API key authentication.
 """
 
+import hashlib
+import hmac
 import os
 from fastapi import Header, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from fastapi.security import APIKeyHeader
-from typing import Optional
+from typing import Iterable, Optional
 
 API_KEY_HEADER = "X-API-Key"
+_API_KEY_HEADER_RAW = API_KEY_HEADER.lower().encode("latin-1")
+MAX_API_KEY_LENGTH = 512
 ARMOR_API_KEY = os.getenv("ARMOR_API_KEY")
+_ARMOR_API_KEY_DIGEST = (
+    hashlib.sha256(ARMOR_API_KEY.encode("utf-8")).digest() if ARMOR_API_KEY else None
+)
 api_key_header = APIKeyHeader(name=API_KEY_HEADER, auto_error=False)
 
 
@@ -26,7 +34,14 @@ def verify_api_key(api_key: Optional[str] = Header(None, alias=API_KEY_HEADER))
             detail="Missing API key. Please provide X-API-Key header"
         )
     
-    if api_key != ARMOR_API_KEY:
+    if len(api_key) > MAX_API_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid API key"
+        )
+    
+    api_key_digest = hashlib.sha256(api_key.encode("utf-8")).digest()
+    if not hmac.compare_digest(api_key_digest, _ARMOR_API_KEY_DIGEST):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key"
@@ -39,3 +54,33 @@ def get_authenticated_api_key(api_key: Optional[str] = Header(None, alias=API_KE
     """FastAPI dependency to verify API key."""
     return verify_api_key(api_key)
 
+
+class APIKeyMiddleware:
+    """
+    ASGI middleware that verifies the API key before routing.
+    Rejected requests never reach dependency resolution or the database.
+    """
+
+    def __init__(self, app, exempt_paths: Iterable[str] = ()):
+        self.app = app
+        self.exempt_paths = frozenset(exempt_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        api_key = None
+        for name, value in scope["headers"]:
+            if name == _API_KEY_HEADER_RAW:
+                api_key = value.decode("latin-1")
+                break
+
+        try:
+            verify_api_key(api_key)
+        except HTTPException as exc:
+            response = ORJSONResponse({"detail": exc.detail}, status_code=exc.status_code)
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,137 @@
+"""
+Background writer that groups balance changes into shared commits.
+"""
+
+import asyncio
+from crud import bulk_record_transactions
+
+MAX_BATCH_SIZE = 500
+_STOP = object()
+
+
+class BalanceChangeBatcher:
+    """
+    Collects deposits/withdrawals for a short window and applies them in one
+    database transaction. Each change keeps its own guarded UPDATE ... RETURNING,
+    so per-request results (including insufficient balance) are unchanged;
+    the transaction rows go out as multi-row INSERTs and a single commit.
+    """
+
+    def __init__(self, session_factory, update_statements, window: float, on_commit=None):
+        self._session_factory = session_factory
+        self._update_statements = update_statements
+        self._window = window
+        self._on_commit = on_commit
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = None
+        self._stopping = False
+
+    def start(self) -> None:
+        """Start the background flush task."""
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Let the flush task apply everything already submitted, then stop it."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._queue.put_nowait(_STOP)
+        await self._task
+        self._task = None
+
+    async def submit(self, account_id, amount, transaction_type):
+        """Queue a balance change and wait for the batch that applies it."""
+        if self._task is None or self._stopping:
+            raise RuntimeError("Balance change batcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((account_id, amount, transaction_type, future))
+        return await future
+
+    async def _run(self) -> None:
+        batch = []
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is _STOP:
+                    return
+                batch = [item]
+                await asyncio.sleep(self._window)
+                stop_seen = False
+                while len(batch) < MAX_BATCH_SIZE and not self._queue.empty():
+                    item = self._queue.get_nowait()
+                    if item is _STOP:
+                        stop_seen = True
+                        break
+                    batch.append(item)
+                await self._flush(batch)
+                batch = []
+                if stop_seen:
+                    return
+        except asyncio.CancelledError:
+            # Never leave a submitter waiting on a batch that will not be applied
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is not _STOP:
+                    batch.append(item)
+            for *_, future in batch:
+                if not future.done():
+                    future.cancel()
+            raise
+
+    async def _flush(self, batch) -> None:
+        # Lock accounts in a consistent order so concurrent batches cannot
+        # deadlock; the sort is stable, so per-account order is preserved.
+        # Submitters that gave up (e.g. client disconnected) are not applied
+        batch = sorted(
+            (item for item in batch if not item[3].done()), key=lambda item: item[0]
+        )
+        if not batch:
+            return
+        try:
+            results = await self._apply(batch)
+        except Exception as exc:
+            if len(batch) > 1:
+                # One bad change must not fail the whole batch: redo each on its own
+                for item in batch:
+                    await self._flush([item])
+                return
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        except BaseException:
+            for *_, future in batch:
+                if not future.done():
+                    future.cancel()
+            raise
+
+        try:
+            # Runs here rather than in the submitters, which may have been cancelled
+            if self._on_commit is not None:
+                await self._on_commit({account.account_id for account in results if account})
+        finally:
+            for (*_, future), account in zip(batch, results):
+                if not future.done():
+                    future.set_result(account)
+
+    async def _apply(self, batch) -> list:
+        """Apply a batch in one transaction; return the updated row (or None) per item."""
+        results = []
+        async with self._session_factory() as db:
+            async with db.begin():
+                rows = []
+                for account_id, amount, transaction_type, _ in batch:
+                    account = (await db.execute(
+                        self._update_statements[transaction_type],
+                        {"acct_id": account_id, "amt": amount}
+                    )).first()
+                    results.append(account)
+                    if account:
+                        rows.append({
+                            "account_id": account_id,
+                            "transaction_type": transaction_type,
+                            "amount": amount
+                        })
+                await bulk_record_transactions(db, rows)
+        return results
@@ -0,0 +1,97 @@
+"""
+Redis-backed cache for account lookups.
+Caching is disabled when REDIS_URL is not set.
+
+Only reads populate the cache. Writes delete the entry and bump a per-account
+version; a read stores what it loaded only if the version is unchanged, so a
+slow reader can never put back a balance older than the last write.
+"""
+
+import os
+import orjson
+from typing import Iterable, Optional, Tuple
+
+REDIS_URL = os.getenv("REDIS_URL")
+ACCOUNT_CACHE_TTL = 60
+ACCOUNT_VERSION_TTL = 86400
+
+if REDIS_URL:
+    from redis.asyncio import Redis
+    from redis.exceptions import RedisError, WatchError
+    redis_client = Redis.from_url(REDIS_URL)
+else:
+    redis_client = None
+
+
+def _account_key(account_id: int) -> str:
+    """Build the cache key for an account."""
+    return f"account:{account_id}"
+
+
+def _version_key(account_id: int) -> str:
+    """Build the key holding an account's write version."""
+    return f"account:{account_id}:ver"
+
+
+async def get_cached_account(account_id: int) -> Tuple[Optional[dict], Optional[bytes]]:
+    """
+    Return the cached account fields (None on a miss) and the account's
+    current write version, to be passed back to cache_account.
+    """
+    if redis_client is None:
+        return None, None
+    try:
+        data, version = await redis_client.mget(
+            _account_key(account_id), _version_key(account_id)
+        )
+    except RedisError:
+        return None, None
+    return (orjson.loads(data) if data is not None else None), version
+
+
+async def cache_account(account, version: Optional[bytes]) -> None:
+    """
+    Store an account loaded after a cache miss, unless a write has bumped
+    its version since get_cached_account returned `version`.
+    """
+    if redis_client is None:
+        return
+    data = orjson.dumps({
+        "account_id": account.account_id,
+        "name": account.name,
+        "balance": str(account.balance)
+    })
+    version_key = _version_key(account.account_id)
+    try:
+        async with redis_client.pipeline() as pipe:
+            await pipe.watch(version_key)
+            if await pipe.get(version_key) != version:
+                return
+            pipe.multi()
+            pipe.set(_account_key(account.account_id), data, ex=ACCOUNT_CACHE_TTL)
+            await pipe.execute()
+    except (WatchError, RedisError):
+        pass
+
+
+async def invalidate_accounts(account_ids: Iterable[int]) -> None:
+    """Drop the cached fields of written accounts and bump their versions."""
+    account_ids = list(account_ids)
+    if redis_client is None or not account_ids:
+        return
+    try:
+        async with redis_client.pipeline() as pipe:
+            for account_id in account_ids:
+                version_key = _version_key(account_id)
+                pipe.incr(version_key)
+                pipe.expire(version_key, ACCOUNT_VERSION_TTL)
+                pipe.delete(_account_key(account_id))
+            await pipe.execute()
+    except RedisError:
+        pass
+
+
+async def close_cache() -> None:
+    """Close the Redis connection pool."""
+    if redis_client is not None:
+        await redis_client.aclose()
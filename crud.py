@@ -0,0 +1,23 @@
+"""
+Reusable database operations outside the request handlers.
+"""
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Iterable
+from models import Transaction
+
+# Rows per INSERT; 3 parameters each keeps a statement under SQLite's
+# historical 999 bind-parameter limit (asyncpg allows 32767).
+INSERT_CHUNK_SIZE = 300
+
+
+async def bulk_record_transactions(db: AsyncSession, rows: Iterable[dict]) -> None:
+    """
+    Insert many transaction rows as multi-row INSERT ... VALUES statements.
+    Each row is a dict with account_id, transaction_type and amount.
+    Balances are not touched; the caller commits.
+    """
+    rows = list(rows)
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        await db.execute(insert(Transaction).values(rows[start:start + INSERT_CHUNK_SIZE]))
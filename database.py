@@ -2,90 +2,74 @@
 Database connection and session management.
 """
 
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from fastapi import Depends
-from typing import TYPE_CHECKING
-
-if TYPE_CHECKING:
-    from schemas import EmptyInput
-    from auth import get_authenticated_api_key
-
-
-def _create_empty_input_schema():
-    """Create EmptyInput instance."""
-    from schemas import EmptyInput
-    return EmptyInput()
-
-
-def _get_empty_input_dependency(
-    input_schema: "EmptyInput" = Depends(_create_empty_input_schema)
-):
-    """Get authentication dependency."""
-    from auth import get_authenticated_api_key
-    return get_authenticated_api_key
-
-
-def _create_empty_input(
-    input_schema: "EmptyInput" = Depends(_create_empty_input_schema)
-) -> "EmptyInput":
-    """Create empty input instance."""
-    return input_schema
-
-
-def _get_empty_input(
-    input_schema: "EmptyInput" = Depends(_create_empty_input_schema),
-    api_key: str = Depends(_get_empty_input_dependency)
-) -> "EmptyInput":
-    """Get empty input with authentication."""
-    return input_schema
-
-SQLALCHEMY_DATABASE_URL = "sqlite:///./banking.db"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+from typing import Annotated, AsyncGenerator
+from deps import AuthDep
+
+
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./banking.db")
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+if IS_SQLITE:
+    # An in-memory database lives only as long as its connection, so share one;
+    # file databases keep the default queue pool so WAL readers run concurrently.
+    engine = create_async_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False, "timeout": 30},
+        **({"poolclass": StaticPool} if ":memory:" in SQLALCHEMY_DATABASE_URL else {})
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragma(dbapi_conn, _):
+        """Apply WAL and cache PRAGMAs to each new SQLite connection."""
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        cur.execute("PRAGMA cache_size=-64000")
+        cur.close()
+else:
+    engine = create_async_engine(
+        SQLALCHEMY_DATABASE_URL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=30,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+        connect_args=(
+            {"server_settings": {"tcp_keepalives_idle": "60"}}
+            if "+asyncpg" in SQLALCHEMY_DATABASE_URL else {}
+        )
+    )
+
+
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
 
-def get_db(
-    input_schema: "EmptyInput" = Depends(_get_empty_input),
-    api_key: str = Depends(_get_empty_input_dependency)
-):
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """Get database session."""
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def init_db(
-    input_schema: "EmptyInput",
-    api_key: str = None
-):
+DbDep = Annotated[AsyncSession, Depends(get_db)]
+
+
+async def init_db():
     """Initialize database tables."""
-    from schemas import EmptyInput as EmptyInputClass
-    if not isinstance(input_schema, EmptyInputClass):
-        raise ValueError("input_schema must be an EmptyInput instance")
-    
-    if api_key is not None:
-        import os
-        expected_key = os.getenv("ARMOR_API_KEY")
-        if not expected_key or api_key != expected_key:
-            raise ValueError("Invalid API key")
-    
-    Base.metadata.create_all(bind=engine)
-
-
-def init_db_with_auth(
-    input_schema: "EmptyInput" = Depends(_create_empty_input_schema),
-    api_key: str = Depends(_get_empty_input_dependency)
-):
-    """Initialize database with authentication."""
-    init_db(input_schema, api_key)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
 
+
+async def init_db_with_auth(api_key: AuthDep):
+    """Initialize database with authentication."""
+    await init_db()
@@ -0,0 +1,20 @@
+"""
+Shared FastAPI dependencies and input schemas.
+Leaf module with no imports from database, models or schemas.
+"""
+
+from fastapi import Depends
+from pydantic import BaseModel, ConfigDict
+from typing import Annotated
+from auth import get_authenticated_api_key
+
+
+class EmptyInput(BaseModel):
+    """Empty input schema."""
+    model_config = ConfigDict(extra="forbid")
+
+
+AuthDep = Annotated[str, Depends(get_authenticated_api_key)]
+
+
+__all__ = ["AuthDep", "EmptyInput", "get_authenticated_api_key"]
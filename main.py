@@ -2,12 +2,23 @@
 Banking system API with FastAPI.
 """
 
-from fastapi import FastAPI, Depends, HTTPException, status, Query, Path
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db, init_db
-from models import Account, Transaction, TransactionType
-from auth import get_authenticated_api_key
+import asyncio
+import itertools
+import orjson
+import os
+import time
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from fastapi import FastAPI, HTTPException, Request, Security, status, Query, Path
+from fastapi.responses import ORJSONResponse, Response
+from sqlalchemy import bindparam, insert, select, text, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Annotated, Dict, Iterable, List, Optional, Tuple
+from batching import BalanceChangeBatcher
+from cache import cache_account, close_cache, get_cached_account, invalidate_accounts
+from database import IS_SQLITE, DbDep, SessionLocal, engine, init_db
+from models import CENT, MAX_BALANCE, Account, Transaction, TransactionType
+from auth import ARMOR_API_KEY, APIKeyMiddleware, api_key_header
 from schemas import (
     AccountCreate,
     AccountResponse,
@@ -16,194 +27,446 @@ from schemas import (
     BalanceResponse,
     TransactionHistoryResponse,
     TransactionResponse,
-    EmptyInput,
     BalanceQueryInput,
     TransactionHistoryQueryInput
 )
 
 
+if not ARMOR_API_KEY:
+    raise RuntimeError("ARMOR_API_KEY environment variable must be set")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize database tables and warm the connection on startup."""
+    await init_db()
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    if _balance_batcher is not None:
+        _balance_batcher.start()
+    yield
+    if _balance_batcher is not None:
+        await _balance_batcher.stop()
+    await close_cache()
+    await engine.dispose()
+
+
+def _account_not_found(account_id: int) -> HTTPException:
+    """Build the 404 raised when an account does not exist."""
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Account {account_id} not found"
+    )
+
+
+# Hot statements are built once; per-request values are bound at execution
+_ACCOUNT_COLUMNS = (Account.account_id, Account.name, Account.balance)
+
+_DEPOSIT_STMT = (
+    update(Account)
+    .where(
+        Account.account_id == bindparam("acct_id"),
+        Account.balance + bindparam("amt") <= MAX_BALANCE
+    )
+    .values(balance=Account.balance + bindparam("amt"))
+    .returning(*_ACCOUNT_COLUMNS)
+)
+
+_WITHDRAW_STMT = (
+    update(Account)
+    .where(
+        Account.account_id == bindparam("acct_id"),
+        Account.balance >= bindparam("amt")
+    )
+    .values(balance=Account.balance - bindparam("amt"))
+    .returning(*_ACCOUNT_COLUMNS)
+)
+
+_INSERT_TRANSACTION_STMT = insert(Transaction).values(
+    account_id=bindparam("acct_id"),
+    transaction_type=bindparam("tx_type"),
+    amount=bindparam("amt")
+)
+
+# Limit and order inside the derived table so it is served from
+# ix_tx_account_ts; the outer join to accounts only tells a missing
+# account apart from one with no transactions.
+_RECENT_TRANSACTIONS = (
+    select(
+        Transaction.transaction_id,
+        Transaction.account_id,
+        Transaction.transaction_type,
+        Transaction.amount,
+        Transaction.timestamp
+    )
+    .where(Transaction.account_id == bindparam("acct_id"))
+    .order_by(Transaction.timestamp.desc())
+    .limit(bindparam("limit"))
+    .subquery("recent")
+)
+
+_TRANSACTION_HISTORY_STMT = (
+    select(*_RECENT_TRANSACTIONS.c)
+    .select_from(Account)
+    .outerjoin(_RECENT_TRANSACTIONS, true())
+    .where(Account.account_id == bindparam("acct_id"))
+    .order_by(_RECENT_TRANSACTIONS.c.timestamp.desc())
+)
+
+
+def _with_transaction_insert(updated):
+    """Wrap a balance UPDATE ... RETURNING so the same statement logs the transaction."""
+    upd = updated.cte("upd")
+    ins = insert(Transaction).from_select(
+        ["account_id", "transaction_type", "amount"],
+        select(
+            upd.c.account_id,
+            bindparam("tx_type", type_=Transaction.transaction_type.type),
+            bindparam("amt", type_=Transaction.amount.type)
+        )
+    ).cte("ins")
+    return select(upd).add_cte(ins)
+
+
+_UPDATE_BALANCE_STMTS = {
+    TransactionType.DEPOSIT: _DEPOSIT_STMT,
+    TransactionType.WITHDRAWAL: _WITHDRAW_STMT
+}
+_BALANCE_CHANGE_STMTS = _UPDATE_BALANCE_STMTS
+if not IS_SQLITE:
+    _BALANCE_CHANGE_STMTS = {
+        transaction_type: _with_transaction_insert(stmt)
+        for transaction_type, stmt in _UPDATE_BALANCE_STMTS.items()
+    }
+
+
+# In-process dedup of balance reads (see _load_balance)
+_BALANCE_MICROCACHE_TTL = 0.1
+_BALANCE_MICROCACHE_MAX = 10000
+_inflight_balances: Dict[int, asyncio.Future] = {}
+_recent_balances: Dict[int, Tuple[float, Optional[BalanceResponse]]] = {}
+# Per-account write generation; a lookup only fills the micro-cache if no
+# write landed while it ran. Accounts missing from the map read the floor.
+_balance_write_seq = itertools.count(1)
+_balance_generations: Dict[int, int] = {}
+_balance_generation_floor = 0
+
+
+def _balance_generation(account_id: int) -> int:
+    """Return the account's current write generation."""
+    return _balance_generations.get(account_id, _balance_generation_floor)
+
+
+def _invalidate_balance(account_id: int) -> None:
+    """Forget in-process balance state for an account after a write."""
+    global _balance_generation_floor
+    generation = next(_balance_write_seq)
+    if len(_balance_generations) >= _BALANCE_MICROCACHE_MAX:
+        _balance_generations.clear()
+        _balance_generation_floor = generation
+    _balance_generations[account_id] = generation
+    _recent_balances.pop(account_id, None)
+    _inflight_balances.pop(account_id, None)
+
+
+async def _balances_written(account_ids: Iterable[int]) -> None:
+    """Invalidate in-process and Redis cached balances after a committed write."""
+    account_ids = list(account_ids)
+    for account_id in account_ids:
+        _invalidate_balance(account_id)
+    await invalidate_accounts(account_ids)
+
+
+# Set WRITE_BATCH_WINDOW_MS > 0 to group deposits/withdrawals into shared commits
+WRITE_BATCH_WINDOW_MS = float(os.getenv("WRITE_BATCH_WINDOW_MS", "0"))
+_balance_batcher = (
+    BalanceChangeBatcher(
+        SessionLocal, _UPDATE_BALANCE_STMTS, WRITE_BATCH_WINDOW_MS / 1000,
+        on_commit=_balances_written
+    )
+    if WRITE_BATCH_WINDOW_MS > 0 else None
+)
+
+
 app = FastAPI(
     title="Banking System API",
     description="Banking system API for account management and transactions",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+    dependencies=[Security(api_key_header)]
+)
+app.add_middleware(
+    APIKeyMiddleware,
+    exempt_paths=(
+        app.docs_url,
+        app.redoc_url,
+        app.openapi_url,
+        app.swagger_ui_oauth2_redirect_url
+    )
 )
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database tables on startup."""
-    import os
-    api_key = os.getenv("ARMOR_API_KEY")
-    if not api_key:
-        raise RuntimeError("ARMOR_API_KEY environment variable must be set")
-    
-    empty_input = EmptyInput()
-    init_db(empty_input, api_key=api_key)
+_ROOT_BYTES = orjson.dumps({
+    "message": "Banking System API",
+    "version": "1.0.0",
+    "endpoints": {
+        "create_account": "POST /accounts",
+        "deposit": "POST /accounts/deposit",
+        "withdraw": "POST /accounts/withdraw",
+        "balance": "GET /accounts/{account_id}/balance",
+        "transactions": "GET /accounts/{account_id}/transactions"
+    }
+})
 
 
-@app.get("/", response_model=dict)
-async def root(api_key: str = Depends(get_authenticated_api_key)):
+@app.get("/", response_class=Response)
+async def root():
     """Root endpoint with API information."""
-    return {
-        "message": "Banking System API",
-        "version": "1.0.0",
-        "endpoints": {
-            "create_account": "POST /accounts",
-            "deposit": "POST /accounts/deposit",
-            "withdraw": "POST /accounts/withdraw",
-            "balance": "GET /accounts/{account_id}/balance",
-            "transactions": "GET /accounts/{account_id}/transactions"
-        }
-    }
+    return Response(content=_ROOT_BYTES, media_type="application/json")
 
 
-@app.post("/accounts", response_model=AccountResponse, status_code=status.HTTP_201_CREATED)
+@app.post(
+    "/accounts",
+    response_model=AccountResponse,
+    response_model_exclude_unset=True,
+    status_code=status.HTTP_201_CREATED
+)
 async def create_account(
     account_data: AccountCreate,
-    db: Session = Depends(get_db),
-    api_key: str = Depends(get_authenticated_api_key)
+    db: DbDep
 ):
     """Create a new bank account."""
-    new_account = Account(
-        name=account_data.name,
-        balance=account_data.initial_balance
+    new_account = (await db.execute(
+        insert(Account)
+        .values(name=account_data.name, balance=account_data.initial_balance)
+        .returning(Account.account_id, Account.name, Account.balance)
+    )).first()
+    await db.commit()
+    _invalidate_balance(new_account.account_id)
+    
+    return new_account
+
+
+async def _apply_balance_change(
+    db: AsyncSession,
+    account_id: int,
+    amount: Decimal,
+    transaction_type: TransactionType
+):
+    """
+    Update an account balance and record the matching transaction.
+    Returns the updated account row, or None if no account was updated
+    (unknown account, balance limit exceeded by a deposit, or insufficient
+    balance for a withdrawal).
+    """
+    params = {"acct_id": account_id, "amt": amount, "tx_type": transaction_type}
+    account = (await db.execute(_BALANCE_CHANGE_STMTS[transaction_type], params)).first()
+    
+    if IS_SQLITE and account:
+        # SQLite does not allow UPDATE/INSERT inside a CTE
+        await db.execute(_INSERT_TRANSACTION_STMT, params)
+    
+    return account
+
+
+async def _change_balance(
+    db: AsyncSession,
+    account_id: int,
+    amount: Decimal,
+    transaction_type: TransactionType
+):
+    """Apply a balance change directly, or through the write batcher when enabled."""
+    if _balance_batcher is not None:
+        return await _balance_batcher.submit(account_id, amount, transaction_type)
+    
+    async with db.begin():
+        account = await _apply_balance_change(db, account_id, amount, transaction_type)
+    if account:
+        # Shielded so a cancelled request still invalidates what it committed
+        await asyncio.shield(_balances_written([account.account_id]))
+    return account
+
+
+async def _fetch_balance(db: AsyncSession, account_id: int) -> Optional[BalanceResponse]:
+    """Read a balance from Redis, falling back to the database."""
+    cached, version = await get_cached_account(account_id)
+    if cached is not None:
+        return BalanceResponse(**cached)
+    
+    account = await db.get(Account, account_id)
+    if not account:
+        return None
+    
+    await cache_account(account, version)
+    return BalanceResponse(
+        account_id=account.account_id,
+        balance=account.balance,
+        name=account.name
     )
+
+
+async def _load_balance(db: AsyncSession, account_id: int) -> Optional[BalanceResponse]:
+    """
+    Load a balance, coalescing concurrent lookups for the same account.
+    The first caller runs the query and later callers await its result;
+    the outcome is then reused for _BALANCE_MICROCACHE_TTL seconds.
+    """
+    recent = _recent_balances.get(account_id)
+    if recent is not None and recent[0] > time.monotonic():
+        return recent[1]
     
-    db.add(new_account)
-    db.commit()
-    db.refresh(new_account)
+    pending = _inflight_balances.get(account_id)
+    if pending is not None:
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            # The leader was cancelled, not us: run our own lookup
+            if not pending.cancelled():
+                raise
+        return await _fetch_balance(db, account_id)
+
+    generation = _balance_generation(account_id)
+    pending = asyncio.get_running_loop().create_future()
+    _inflight_balances[account_id] = pending
+    try:
+        balance = await _fetch_balance(db, account_id)
+    except Exception as exc:
+        pending.set_exception(exc)
+        pending.exception()  # waiters re-raise it; don't log it as unretrieved
+        raise
+    except BaseException:
+        pending.cancel()
+        raise
+    else:
+        pending.set_result(balance)
+    finally:
+        if _inflight_balances.get(account_id) is pending:
+            del _inflight_balances[account_id]
     
-    return new_account
+    if _balance_generation(account_id) != generation:
+        return balance  # a write landed mid-fetch; don't cache what we read
+    if len(_recent_balances) >= _BALANCE_MICROCACHE_MAX:
+        _recent_balances.clear()
+    _recent_balances[account_id] = (time.monotonic() + _BALANCE_MICROCACHE_TTL, balance)
+    return balance
 
 
-@app.post("/accounts/deposit", response_model=AccountResponse)
+@app.post("/accounts/deposit", response_model=AccountResponse, response_model_exclude_unset=True)
 async def deposit_money(
     deposit_data: DepositRequest,
-    db: Session = Depends(get_db),
-    api_key: str = Depends(get_authenticated_api_key)
+    db: DbDep
 ):
     """Deposit money into an account."""
-    account = db.query(Account).filter(Account.account_id == deposit_data.account_id).first()
+    account = await _change_balance(
+        db, deposit_data.account_id, deposit_data.amount, TransactionType.DEPOSIT
+    )
     
     if not account:
+        account = await db.get(Account, deposit_data.account_id)
+        
+        if not account:
+            raise _account_not_found(deposit_data.account_id)
+        
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
+            status_code=status.HTTP_400_BAD_REQUEST,
             detail={
-                "error": "Account not found",
-                "account_id": deposit_data.account_id,
-                "message": "The specified account does not exist"
+                "error": "Balance limit exceeded",
+                "current_balance": str(account.balance),
+                "requested_amount": str(deposit_data.amount.quantize(CENT)),
+                "message": f"Account balance cannot exceed {MAX_BALANCE}"
             }
         )
     
-    account.balance += deposit_data.amount
-    
-    transaction = Transaction(
-        account_id=account.account_id,
-        transaction_type=TransactionType.DEPOSIT,
-        amount=deposit_data.amount
-    )
-    db.add(transaction)
-    db.commit()
-    db.refresh(account)
-    
     return account
 
 
-@app.post("/accounts/withdraw", response_model=AccountResponse)
+@app.post("/accounts/withdraw", response_model=AccountResponse, response_model_exclude_unset=True)
 async def withdraw_money(
     withdraw_data: WithdrawRequest,
-    db: Session = Depends(get_db),
-    api_key: str = Depends(get_authenticated_api_key)
+    db: DbDep
 ):
     """Withdraw money from an account."""
-    account = db.query(Account).filter(Account.account_id == withdraw_data.account_id).first()
+    account = await _change_balance(
+        db, withdraw_data.account_id, withdraw_data.amount, TransactionType.WITHDRAWAL
+    )
     
     if not account:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={
-                "error": "Account not found",
-                "account_id": withdraw_data.account_id,
-                "message": "The specified account does not exist"
-            }
-        )
-    
-    if account.balance < withdraw_data.amount:
+        account = await db.get(Account, withdraw_data.account_id)
+        
+        if not account:
+            raise _account_not_found(withdraw_data.account_id)
+        
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={
                 "error": "Insufficient balance",
-                "current_balance": account.balance,
-                "requested_amount": withdraw_data.amount,
+                "current_balance": str(account.balance),
+                "requested_amount": str(withdraw_data.amount.quantize(CENT)),
                 "message": "Account balance is insufficient for this withdrawal"
             }
         )
     
-    account.balance -= withdraw_data.amount
-    
-    transaction = Transaction(
-        account_id=account.account_id,
-        transaction_type=TransactionType.WITHDRAWAL,
-        amount=withdraw_data.amount
-    )
-    db.add(transaction)
-    db.commit()
-    db.refresh(account)
-    
     return account
 
 
-@app.get("/accounts/{account_id}/balance", response_model=BalanceResponse)
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak If-None-Match comparison (RFC 7232): opaque tags equal, W/ ignored."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == opaque_tag for tag in if_none_match.split(",")
+    )
+
+
+@app.get(
+    "/accounts/{account_id}/balance",
+    response_model=None,
+    responses={
+        200: {"model": BalanceResponse},
+        304: {"description": "Balance unchanged since the ETag in If-None-Match"}
+    }
+)
 async def get_balance(
-    account_id: int = Path(..., gt=0, description="Account ID to query"),
-    db: Session = Depends(get_db),
-    api_key: str = Depends(get_authenticated_api_key)
+    account_id: Annotated[int, Path(gt=0, description="Account ID to query")],
+    request: Request,
+    response: Response,
+    db: DbDep
 ):
     """Get the current balance of an account."""
-    account = db.query(Account).filter(Account.account_id == account_id).first()
+    balance = await _load_balance(db, account_id)
     
-    if not account:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={
-                "error": "Account not found",
-                "account_id": account_id,
-                "message": "The specified account does not exist"
-            }
-        )
+    if balance is None:
+        raise _account_not_found(account_id)
     
-    return BalanceResponse(
-        account_id=account.account_id,
-        balance=account.balance,
-        name=account.name
-    )
+    etag = f'W/"{balance.account_id}-{balance.balance}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    response.headers.update(headers)
+    return balance
 
 
 @app.get("/accounts/{account_id}/transactions", response_model=TransactionHistoryResponse)
 async def get_transaction_history(
-    account_id: int = Path(..., gt=0, description="Account ID to query"),
-    limit: int = Query(default=50, ge=1, le=1000, description="Maximum number of transactions to return"),
-    db: Session = Depends(get_db),
-    api_key: str = Depends(get_authenticated_api_key)
+    account_id: Annotated[int, Path(gt=0, description="Account ID to query")],
+    db: DbDep,
+    limit: Annotated[
+        int, Query(ge=1, le=1000, description="Maximum number of transactions to return")
+    ] = 50
 ):
     """Get transaction history for an account."""
-    account = db.query(Account).filter(Account.account_id == account_id).first()
+    rows = (await db.execute(
+        _TRANSACTION_HISTORY_STMT, {"acct_id": account_id, "limit": limit}
+    )).all()
     
-    if not account:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail={
-                "error": "Account not found",
-                "account_id": account_id,
-                "message": "The specified account does not exist"
-            }
-        )
+    if not rows:
+        raise _account_not_found(account_id)
     
-    transactions = db.query(Transaction)\
-        .filter(Transaction.account_id == account_id)\
-        .order_by(Transaction.timestamp.desc())\
-        .limit(limit)\
-        .all()
+    transactions = [row for row in rows if row.transaction_id is not None]
     
     return TransactionHistoryResponse(
         account_id=account_id,
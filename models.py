@@ -3,17 +3,54 @@ SQLAlchemy models for the banking system.
 Defines the database schema for Account and Transaction tables.
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum
+from sqlalchemy import BigInteger, Column, Integer, SmallInteger, String, Numeric, DateTime, ForeignKey, Index, text
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
+from decimal import Decimal
 from database import Base
 
+CENT = Decimal("0.01")
+# Largest amount a Money column holds (NUMERIC(18, 2))
+MAX_BALANCE = Decimal("9999999999999999.99")
 
-class TransactionType(enum.Enum):
-    """Enumeration for transaction types."""
-    DEPOSIT = "deposit"
-    WITHDRAWAL = "withdrawal"
+
+class Money(TypeDecorator):
+    """
+    Fixed-point amount with two decimal places.
+    Stored as NUMERIC(18, 2) where supported; SQLite has no decimal storage
+    (NUMERIC becomes REAL), so there it is stored as integer cents to keep
+    arithmetic and comparisons in SQL exact.
+    """
+    impl = Numeric(18, 2)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(BigInteger())
+        return dialect.type_descriptor(Numeric(18, 2))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        value = Decimal(value).quantize(CENT)
+        if dialect.name == "sqlite":
+            return int(value.scaleb(2))
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if dialect.name == "sqlite":
+            return Decimal(value).scaleb(-2).quantize(CENT)
+        return Decimal(value).quantize(CENT)
+
+
+class TransactionType(enum.IntEnum):
+    """Enumeration for transaction types, stored as a small integer."""
+    DEPOSIT = 0
+    WITHDRAWAL = 1
 
 
 class Account(Base):
@@ -25,8 +62,10 @@ class Account(Base):
 
     account_id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)
-    balance = Column(Float, nullable=False, default=0.0)
-    transactions = relationship("Transaction", back_populates="account", cascade="all, delete-orphan")
+    balance = Column(Money, nullable=False, default=Decimal("0"))
+    transactions = relationship(
+        "Transaction", back_populates="account", cascade="all, delete-orphan", lazy="raise"
+    )
 
 
 class Transaction(Base):
@@ -35,11 +74,19 @@ class Transaction(Base):
     Each transaction is linked to an account and records the amount and type.
     """
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index(
+            "ix_tx_account_ts",
+            "account_id",
+            text("timestamp DESC"),
+            postgresql_include=["transaction_type", "amount"]
+        ),
+    )
 
     transaction_id = Column(Integer, primary_key=True, index=True)
-    account_id = Column(Integer, ForeignKey("accounts.account_id"), nullable=False, index=True)
-    transaction_type = Column(Enum(TransactionType), nullable=False)
-    amount = Column(Float, nullable=False)
+    account_id = Column(Integer, ForeignKey("accounts.account_id"), nullable=False)
+    transaction_type = Column(SmallInteger, nullable=False)
+    amount = Column(Money, nullable=False)
     timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    account = relationship("Account", back_populates="transactions")
+    account = relationship("Account", back_populates="transactions", lazy="raise")
 
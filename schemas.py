@@ -3,58 +3,63 @@ Pydantic schemas for request/response validation.
 Defines the data structures for API requests and responses.
 """
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_serializer
 from datetime import datetime
+from decimal import Decimal
 from typing import Optional, List
 from models import TransactionType
+from deps import EmptyInput
 
 
 # Request schemas
 class AccountCreate(BaseModel):
     """Schema for creating a new account."""
     name: str = Field(..., min_length=1, max_length=100, description="Account owner's name")
-    initial_balance: float = Field(..., ge=0, description="Initial account balance (must be >= 0)")
+    initial_balance: Decimal = Field(..., ge=0, max_digits=18, decimal_places=2, description="Initial account balance (must be >= 0)")
 
 
 class DepositRequest(BaseModel):
     """Schema for deposit request."""
     account_id: int = Field(..., gt=0, description="Account ID to deposit into")
-    amount: float = Field(..., gt=0, description="Amount to deposit (must be > 0)")
+    amount: Decimal = Field(..., gt=0, max_digits=18, decimal_places=2, description="Amount to deposit (must be > 0)")
 
 
 class WithdrawRequest(BaseModel):
     """Schema for withdrawal request."""
     account_id: int = Field(..., gt=0, description="Account ID to withdraw from")
-    amount: float = Field(..., gt=0, description="Amount to withdraw (must be > 0)")
+    amount: Decimal = Field(..., gt=0, max_digits=18, decimal_places=2, description="Amount to withdraw (must be > 0)")
 
 
 # Response schemas
 class AccountResponse(BaseModel):
     """Schema for account information response."""
+    model_config = ConfigDict(from_attributes=True)
+
     account_id: int
     name: str
-    balance: float
-
-    class Config:
-        from_attributes = True
+    balance: Decimal
 
 
 class TransactionResponse(BaseModel):
     """Schema for transaction information response."""
+    model_config = ConfigDict(from_attributes=True)
+
     transaction_id: int
     account_id: int
     transaction_type: TransactionType
-    amount: float
+    amount: Decimal
     timestamp: datetime
 
-    class Config:
-        from_attributes = True
+    @field_serializer("transaction_type")
+    def serialize_transaction_type(self, transaction_type: TransactionType) -> str:
+        """Expose the type as "deposit"/"withdrawal" rather than its stored integer."""
+        return transaction_type.name.lower()
 
 
 class BalanceResponse(BaseModel):
     """Schema for balance inquiry response."""
     account_id: int
-    balance: float
+    balance: Decimal
     name: str
 
 
@@ -62,13 +67,9 @@ class TransactionHistoryResponse(BaseModel):
     """Schema for transaction history response."""
     account_id: int
     transactions: List[TransactionResponse]
-    total_transactions: int
-
-
-class EmptyInput(BaseModel):
-    """Empty input schema."""
-    class Config:
-        extra = "forbid"
+    total_transactions: int = Field(
+        ..., description="Number of transactions returned (bounded by the request limit)"
+    )
 
 
 class BalanceQueryInput(BaseModel):
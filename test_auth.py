@@ -0,0 +1,32 @@
+"""
+Tests for API key enforcement in APIKeyMiddleware.
+"""
+
+import os
+
+os.environ.setdefault("ARMOR_API_KEY", "test-key")
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
+
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-API-Key": "wrong-key"}])
+def test_missing_or_wrong_key_rejected_before_validation(client, headers):
+    """An invalid body would be a 422 if the request reached dependency resolution."""
+    response = client.post("/accounts", json={"initial_balance": -1}, headers=headers)
+
+    assert response.status_code == 401
+    assert "API key" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("path", ["/docs", "/openapi.json"])
+def test_docs_reachable_without_key(client, path):
+    assert client.get(path).status_code == 200
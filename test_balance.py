@@ -0,0 +1,134 @@
+"""
+Tests for balance reads: in-process coalescing and the micro-cache.
+"""
+
+import os
+
+os.environ.setdefault("ARMOR_API_KEY", "test-key")
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
+
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+import main
+
+HEADERS = {"X-API-Key": os.environ["ARMOR_API_KEY"]}
+
+
+@pytest.fixture(autouse=True)
+def reset_balance_state():
+    main._inflight_balances.clear()
+    main._recent_balances.clear()
+    main._balance_generations.clear()
+    yield
+    main._inflight_balances.clear()
+    main._recent_balances.clear()
+    main._balance_generations.clear()
+
+
+@pytest.fixture
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def slow_fetch(monkeypatch):
+    """Replace the Redis/database lookup with a slow, counting stand-in."""
+    calls = []
+
+    async def fetch(db, account_id):
+        calls.append(account_id)
+        await asyncio.sleep(0.05)
+        return f"balance-{len(calls)}"
+
+    monkeypatch.setattr(main, "_fetch_balance", fetch)
+    return calls
+
+
+def test_concurrent_reads_share_one_fetch(slow_fetch):
+    async def scenario():
+        return await asyncio.gather(*(main._load_balance(None, 1) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["balance-1"] * 5
+    assert slow_fetch == [1]
+
+
+def test_follower_falls_back_when_leader_is_cancelled(slow_fetch):
+    async def scenario():
+        leader = asyncio.create_task(main._load_balance(None, 1))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(main._load_balance(None, 1))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower, leader.cancelled()
+
+    assert asyncio.run(scenario()) == ("balance-2", True)
+    assert slow_fetch == [1, 1]
+
+
+def test_write_during_fetch_is_not_cached(slow_fetch):
+    async def scenario():
+        leader = asyncio.create_task(main._load_balance(None, 1))
+        await asyncio.sleep(0.01)
+        main._invalidate_balance(1)
+        stale = await leader
+        assert 1 not in main._recent_balances
+        return stale, await main._load_balance(None, 1)
+
+    assert asyncio.run(scenario()) == ("balance-1", "balance-2")
+    assert main._recent_balances[1][1] == "balance-2"
+
+
+def test_cached_not_found_is_cleared_by_create(client):
+    existing = client.post(
+        "/accounts", json={"name": "First", "initial_balance": 1}, headers=HEADERS
+    ).json()["account_id"]
+    next_id = existing + 1
+
+    assert client.get(f"/accounts/{next_id}/balance", headers=HEADERS).status_code == 404
+    assert main._recent_balances[next_id][1] is None
+
+    created = client.post(
+        "/accounts", json={"name": "Second", "initial_balance": 2}, headers=HEADERS
+    ).json()["account_id"]
+    response = client.get(f"/accounts/{next_id}/balance", headers=HEADERS)
+
+    assert created == next_id
+    assert response.status_code == 200
+    assert response.json()["balance"] == "2.00"
+
+
+def test_if_none_match_uses_weak_comparison(client):
+    account_id = client.post(
+        "/accounts", json={"name": "ETag", "initial_balance": 5}, headers=HEADERS
+    ).json()["account_id"]
+    etag = client.get(f"/accounts/{account_id}/balance", headers=HEADERS).headers["etag"]
+
+    for if_none_match in (etag, etag.removeprefix("W/"), f'"other", {etag}', "*"):
+        response = client.get(
+            f"/accounts/{account_id}/balance",
+            headers={**HEADERS, "If-None-Match": if_none_match}
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+
+def test_stale_etag_gets_new_balance(client):
+    account_id = client.post(
+        "/accounts", json={"name": "ETag", "initial_balance": 5}, headers=HEADERS
+    ).json()["account_id"]
+    etag = client.get(f"/accounts/{account_id}/balance", headers=HEADERS).headers["etag"]
+    client.post(
+        "/accounts/deposit", json={"account_id": account_id, "amount": 1}, headers=HEADERS
+    )
+
+    response = client.get(
+        f"/accounts/{account_id}/balance", headers={**HEADERS, "If-None-Match": etag}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["balance"] == "6.00"
+    assert response.headers["etag"] != etag
+    assert response.headers["etag"] == f'W/"{account_id}-6.00"'
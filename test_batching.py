@@ -0,0 +1,166 @@
+"""
+Tests for the background balance change batcher.
+"""
+
+import os
+
+os.environ.setdefault("ARMOR_API_KEY", "test-key")
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
+
+import asyncio
+from decimal import Decimal
+import httpx
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import DBAPIError
+import main
+from batching import BalanceChangeBatcher
+from database import SessionLocal, engine, init_db
+from models import Account, Transaction, TransactionType
+
+HEADERS = {"X-API-Key": os.environ["ARMOR_API_KEY"]}
+
+
+def run(coro_fn):
+    """Run a test coroutine against a fresh in-memory database."""
+    async def wrapper():
+        await init_db()
+        try:
+            await coro_fn()
+        finally:
+            await engine.dispose()
+    asyncio.run(wrapper())
+
+
+async def create_account(balance: str) -> int:
+    async with SessionLocal() as db:
+        async with db.begin():
+            account = Account(name="Batch", balance=Decimal(balance))
+            db.add(account)
+        return account.account_id
+
+
+async def stored_state(account_id: int):
+    """Return (balance, transaction count) as persisted."""
+    async with SessionLocal() as db:
+        balance = (await db.get(Account, account_id)).balance
+        count = await db.scalar(
+            select(func.count()).where(Transaction.account_id == account_id)
+        )
+    return balance, count
+
+
+def make_batcher(window: float, commits=None, update_statements=None):
+    async def on_commit(account_ids):
+        if commits is not None:
+            commits.append(set(account_ids))
+    return BalanceChangeBatcher(
+        SessionLocal, update_statements or main._UPDATE_BALANCE_STMTS, window, on_commit=on_commit
+    )
+
+
+def test_batch_returns_per_request_results(monkeypatch):
+    """Requests sharing one commit still get their own 200/400/404."""
+    commits = []
+    monkeypatch.setattr(main, "_balance_batcher", make_batcher(0.05, commits))
+
+    async def scenario():
+        account_id = await create_account("10")
+        requests = [
+            ("/accounts/deposit", account_id, "5"),
+            ("/accounts/deposit", account_id, "5"),
+            ("/accounts/withdraw", account_id, "5"),
+            ("/accounts/withdraw", account_id, "1000"),
+            ("/accounts/withdraw", account_id, "1000"),
+            ("/accounts/deposit", account_id + 1, "5"),
+        ]
+        main._balance_batcher.start()
+        try:
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                responses = await asyncio.gather(*(
+                    client.post(path, json={"account_id": target, "amount": amount}, headers=HEADERS)
+                    for path, target, amount in requests
+                ))
+        finally:
+            await main._balance_batcher.stop()
+
+        assert [response.status_code for response in responses] == [200, 200, 200, 400, 400, 404]
+        assert commits == [{account_id}]
+        assert await stored_state(account_id) == (Decimal("15.00"), 3)
+
+    run(scenario)
+
+
+def test_failing_change_only_fails_its_own_request():
+    update_statements = {
+        **main._UPDATE_BALANCE_STMTS,
+        "broken": text("UPDATE accounts SET no_such_column = 1 RETURNING account_id")
+    }
+    batcher = make_batcher(0.05, update_statements=update_statements)
+
+    async def scenario():
+        first = await create_account("10")
+        second = await create_account("20")
+        batcher.start()
+        try:
+            results = await asyncio.gather(
+                batcher.submit(first, Decimal("1"), TransactionType.DEPOSIT),
+                batcher.submit(first, Decimal("1"), "broken"),
+                batcher.submit(second, Decimal("1"), TransactionType.WITHDRAWAL),
+                return_exceptions=True
+            )
+        finally:
+            await batcher.stop()
+
+        assert results[0].balance == Decimal("11.00")
+        assert isinstance(results[1], DBAPIError)
+        assert results[2].balance == Decimal("19.00")
+        assert await stored_state(first) == (Decimal("11.00"), 1)
+
+    run(scenario)
+
+
+def test_stop_applies_changes_still_in_the_window():
+    batcher = make_batcher(0.2)
+
+    async def scenario():
+        account_id = await create_account("10")
+        batcher.start()
+        pending = [
+            asyncio.create_task(batcher.submit(account_id, Decimal("1"), TransactionType.DEPOSIT))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(batcher.stop(), 1)
+
+        assert [task.result().balance for task in pending] == [
+            Decimal("11.00"), Decimal("12.00"), Decimal("13.00")
+        ]
+        with pytest.raises(RuntimeError):
+            await batcher.submit(account_id, Decimal("1"), TransactionType.DEPOSIT)
+
+    run(scenario)
+
+
+def test_cancelled_submitter_is_not_applied():
+    commits = []
+    batcher = make_batcher(0.05, commits)
+
+    async def scenario():
+        account_id = await create_account("10")
+        batcher.start()
+        try:
+            submitted = asyncio.create_task(
+                batcher.submit(account_id, Decimal("5"), TransactionType.DEPOSIT)
+            )
+            await asyncio.sleep(0.01)
+            submitted.cancel()
+            await asyncio.sleep(0.1)
+        finally:
+            await batcher.stop()
+
+        assert await stored_state(account_id) == (Decimal("10.00"), 0)
+        assert commits == []
+
+    run(scenario)
@@ -0,0 +1,68 @@
+"""
+Regression tests for fixed-point money handling.
+"""
+
+import os
+
+os.environ.setdefault("ARMOR_API_KEY", "test-key")
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///:memory:"
+
+from decimal import Decimal
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+
+HEADERS = {"X-API-Key": os.environ["ARMOR_API_KEY"]}
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_balance_stays_on_cent_grid(client):
+    """Repeated deposits must not drift, so withdrawing the exact total succeeds."""
+    account_id = client.post(
+        "/accounts", json={"name": "Drift", "initial_balance": 100.1}, headers=HEADERS
+    ).json()["account_id"]
+    for amount in (0.1, 0.2):
+        client.post(
+            "/accounts/deposit", json={"account_id": account_id, "amount": amount}, headers=HEADERS
+        )
+
+    response = client.post(
+        "/accounts/withdraw", json={"account_id": account_id, "amount": 100.4}, headers=HEADERS
+    )
+
+    assert response.status_code == 200
+    assert Decimal(str(response.json()["balance"])) == Decimal("0")
+
+
+def test_large_amount_round_trips_exactly(client):
+    """Amounts are serialized without passing through float."""
+    response = client.post(
+        "/accounts",
+        json={"name": "Large", "initial_balance": "1234567890123456.78"},
+        headers=HEADERS
+    )
+
+    assert response.json()["balance"] == "1234567890123456.78"
+
+
+def test_deposit_beyond_max_balance_is_rejected(client):
+    """Deposits cannot push a balance past what the column can hold exactly."""
+    account_id = client.post(
+        "/accounts",
+        json={"name": "Max", "initial_balance": "9999999999999999.99"},
+        headers=HEADERS
+    ).json()["account_id"]
+
+    response = client.post(
+        "/accounts/deposit", json={"account_id": account_id, "amount": "0.01"}, headers=HEADERS
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"]["current_balance"] == "9999999999999999.99"
+    balance = client.get(f"/accounts/{account_id}/balance", headers=HEADERS).json()["balance"]
+    assert balance == "9999999999999999.99"